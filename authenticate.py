@@ -2,14 +2,15 @@
 """
 authenticate.py
 
-Authenticates to a QTM backend environment using username/password, then saves
-the Bearer token in a local .env file under AUTH_TOKEN.
+Authenticates to a QTM backend environment using username/password and returns
+the Bearer token. The token is passed along in memory; save_token() can persist
+it to the local .env file under AUTH_TOKEN once the run is over.
 
 Environment/Configuration:
 1. Looks for QTM_ENVIRONMENT in the .env file, defaulting to "qa" if not found.
 2. Looks for AUTH_USERNAME and AUTH_PASSWORD in the .env file, defaulting to
    "dszilagyi" / "Koszonom1!!!" if not found.
-3. Map QTM_ENVIRONMENT to the correct base URL from ENVIRONMENTS.
+3. Map QTM_ENVIRONMENT to the correct base URL from ENVIRONMENTS in config.py.
 
 Example .env:
     QTM_ENVIRONMENT=qa
@@ -17,72 +18,75 @@ Example .env:
     AUTH_PASSWORD=somepass
 """
 
-import os
 import json
 import requests
-from dotenv import load_dotenv, set_key
+from dotenv import set_key
 
-# Dictionary of possible environments
-ENVIRONMENTS = {
-    "qa": "https://qtm-backend-qa.azurewebsites.net",
-    "staging": "https://qtm-backend-staging.azurewebsites.net",
-    "prod": "https://qtm-backend.azurewebsites.net"
-    # Add additional environments as needed
-}
+from config import BASE_URL, CFG
+from http_client import SESSION, check_status, decode_json
 
-def authenticate_and_save_token():
+def authenticate():
     """
     Authenticates to the QTM environment selected by QTM_ENVIRONMENT in .env,
     using the provided username/password from .env as well.
-    Saves the returned accessToken to .env under 'AUTH_TOKEN'.
+
+    Returns:
+        str: The accessToken returned by the login endpoint.
 
     Raises:
         SystemError: If the authentication request fails (network issue, 4xx/5xx response).
         ValueError: If 'accessToken' was not found in the response.
     """
 
-    # Load environment variables from .env
-    load_dotenv()
-
     # Determine which environment to use
-    environment_name = os.getenv("QTM_ENVIRONMENT", "qa").lower().strip()
-    base_url = ENVIRONMENTS.get(environment_name)
+    environment_name = CFG.environment
+    base_url = BASE_URL
     if not base_url:
         # If the environment is not in our dictionary, raise an error
         raise ValueError(
             f"Unknown environment '{environment_name}'. "
-            f"Check QTM_ENVIRONMENT in .env or add to ENVIRONMENTS dict."
+            f"Check QTM_ENVIRONMENT in .env or add to ENVIRONMENTS in config.py."
         )
 
     # Retrieve credentials from .env or use defaults
-    user_name = os.getenv("AUTH_USERNAME", "dszilagyi")
-    password = os.getenv("AUTH_PASSWORD", "Koszonom1!!!")
+    user_name = CFG.username
+    password = CFG.password
 
     # Construct the login endpoint URL
     url = f"{base_url}/api/v1/login"
-    headers = {
-        'Content-Type': 'application/json',
-        'Accept': 'application/json'
-    }
     data = {
         "userName": user_name,
         "password": password
     }
 
     try:
-        response = requests.post(url, json=data, headers=headers)
-        response.raise_for_status()
-        response_data = response.json()
+        response = SESSION.post(url, json=data)
+        check_status(response)
+        response_data = decode_json(response)
         token = response_data.get('accessToken')
 
         if not token:
             raise ValueError("ERROR: 'accessToken' not found in response JSON.")
 
-        dotenv_path = '.env'
-        set_key(dotenv_path, 'AUTH_TOKEN', token)
-        print(f"Bearer token saved to .env file under AUTH_TOKEN for environment '{environment_name}'.")
+        print(f"Authenticated to environment '{environment_name}'.")
+        return token
 
     except requests.RequestException as e:
         raise SystemError(f"Authentication request failed: {e}")
     except ValueError as ve:
         raise ValueError(str(ve))
+
+def save_token(token, dotenv_path='.env'):
+    """
+    Best-effort write of 'token' to the .env file under 'AUTH_TOKEN', so it can be
+    reused (e.g. when authentication has to be skipped because of MFA).
+    Failures are reported but never raised; an empty or None token is not written.
+    """
+    if not token:
+        print("No token to save; leaving AUTH_TOKEN in .env unchanged.")
+        return
+    try:
+        set_key(dotenv_path, 'AUTH_TOKEN', token)
+        print(f"Bearer token saved to {dotenv_path} file under AUTH_TOKEN.")
+    except OSError as e:
+        print(f"Could not save token to {dotenv_path}: {e}")
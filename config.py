@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+config.py
+
+Loads the .env file exactly once (on first import) and exposes the values the
+other scripts need as a read-only CFG object.
+
+Environment/Configuration:
+1. QTM_ENVIRONMENT selects the base URL from ENVIRONMENTS (default: "qa").
+2. AUTH_TOKEN is the Bearer token used for every API call.
+3. PROJECT_ID is the default project to work with.
+4. AUTH_USERNAME / AUTH_PASSWORD are the login credentials.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from dotenv import load_dotenv
+
+# Dictionary of possible environments
+ENVIRONMENTS = {
+    "qa": "https://qtm-backend-qa.azurewebsites.net",
+    "dev": "https://qtm-backend-dev.azurewebsites.net",
+    "staging": "https://qtm-backend-staging.azurewebsites.net",
+    "prod": "https://qtm-backend.azurewebsites.net"
+    # Add additional environments as needed
+}
+
+
+@dataclass(frozen=True)
+class Config:
+    auth_token: Optional[str]
+    project_id: Optional[str]
+    environment: str
+    base_url: Optional[str]  # None if 'environment' is not in ENVIRONMENTS
+    username: str
+    password: str
+
+
+def _load_config():
+    """ Parses .env once and resolves the base URL for QTM_ENVIRONMENT. """
+    load_dotenv()
+    environment = os.getenv("QTM_ENVIRONMENT", "qa").lower().strip()
+    return Config(
+        auth_token=os.getenv("AUTH_TOKEN"),
+        project_id=os.getenv("PROJECT_ID"),
+        environment=environment,
+        base_url=ENVIRONMENTS.get(environment),
+        username=os.getenv("AUTH_USERNAME", "dszilagyi"),
+        password=os.getenv("AUTH_PASSWORD", "Koszonom1!!!"),
+    )
+
+
+CFG = _load_config()
+
+# Pre-resolved base URL for QTM_ENVIRONMENT (None if the environment is unknown)
+BASE_URL = CFG.base_url
@@ -10,61 +10,64 @@ collection configurations into a single step. It looks for phases of type:
   - 2D iOS Field QC
 
 Environment-based Approach:
-1. Looks up QTM_ENVIRONMENT from .env (default: "qa") to pick base URL from ENVIRONMENTS.
-2. Reads AUTH_TOKEN from .env, needed for authorization headers.
+1. Looks up QTM_ENVIRONMENT from .env (default: "qa") to pick base URL from ENVIRONMENTS
+   in config.py.
+2. Reads AUTH_TOKEN from .env (unless a token is passed in), needed for
+   authorization headers.
 3. Optionally reads PROJECT_ID from .env if none is specified as an argument.
 """
 
-import os
 import json
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-from dotenv import load_dotenv
+
+from config import BASE_URL, CFG
+from http_client import SESSION, check_status, decode_json, set_auth_token
 
 # Define the set of phase type names we want to match
-TARGET_PHASE_TYPES = {
+TARGET_PHASE_TYPES = frozenset({
     "2D iOS Collection",
     "QC Web Collection",
     "2D Web Collection",
     "2D iOS Field QC"
-}
-
-# Environment dictionary
-ENVIRONMENTS = {
-    "qa": "https://qtm-backend-qa.azurewebsites.net",
-    "dev": "https://qtm-backend-dev.azurewebsites.net",
-    "prod": "https://qtm-backend.azurewebsites.net"
-    # Add additional environments as necessary
-}
+})
 
 
-def get_phases_with_coco(project_id=None, output_file=None):
+def get_phases_with_coco(project_id=None, output_file=None, auth_token=None, only_null_coco=False):
     """
     1. Loads environment variables for AUTH_TOKEN and optional PROJECT_ID, as well
        as QTM_ENVIRONMENT to determine the base URL.
-    2. Fetches workflow data for the specified (or default) project.
-    3. Extracts only phases whose 'type.name' is in the set TARGET_PHASE_TYPES.
-    4. Fetches collection configurations for that project.
-    5. Creates a single list of dicts that includes:
+    2. Fetches workflow data and collection configurations for the specified
+       (or default) project. Both requests are independent, so they are sent
+       concurrently over the shared session.
+    3. Indexes the collection configurations by integer phase ID.
+    4. Extracts only phases whose 'type.name' is in the set TARGET_PHASE_TYPES,
+       attaching the CoCo ID as each phase is added, into a single list of dicts:
        {
          "id": <phaseId>,
          "name": <phaseName>,
          "phaseType": <typeName>,
          "collectionConfigurationId": <cocoId or None>
        }
-    6. Optionally writes the result to a JSON file if output_file is provided.
+       If only_null_coco is set, phases that already have a CoCo are left out.
+    5. Optionally writes the result to a JSON file if output_file is provided.
 
     Args:
         project_id (int | str): The project ID. If None, uses environment PROJECT_ID.
         output_file (str): If provided, writes the final data to this JSON file.
+        auth_token (str): Bearer token to use. If None, uses environment AUTH_TOKEN.
+        only_null_coco (bool): If True, only returns phases without a CoCo
+            (i.e. the phases eligible for a new one).
 
     Returns:
         list[dict]: A list of dicts, each containing phase info with CoCo ID attached.
     """
-    # Step 1: Load environment variables
-    load_dotenv()
-    auth_token = os.getenv("AUTH_TOKEN")
-    env_project_id = os.getenv("PROJECT_ID")
-    environment_name = os.getenv("QTM_ENVIRONMENT", "qa").lower().strip()
+    # Step 1: Read configuration loaded from .env
+    if auth_token is None:
+        auth_token = CFG.auth_token
+    env_project_id = CFG.project_id
+    environment_name = CFG.environment
 
     if project_id is None:
         project_id = env_project_id
@@ -78,67 +81,59 @@ def get_phases_with_coco(project_id=None, output_file=None):
         return []
 
     # Determine the correct base URL
-    base_url = ENVIRONMENTS.get(environment_name)
+    base_url = BASE_URL
     if not base_url:
         print(f"ERROR: Unknown environment '{environment_name}'. Check QTM_ENVIRONMENT in .env.")
         return []
 
-    # Step 2: Fetch workflow data
+    # Step 2: Fetch workflow data and collection configurations
     workflows_url = f"{base_url}/api/v1/project/{project_id}/workflows"
-    headers = {
-        "Accept": "application/json, text/plain, */*",
-        "Authorization": f"Bearer {auth_token}",
-        "User-Agent": (
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/131.0.0.0 Safari/537.36 Edg/131.0.0.0"
-        ),
-    }
+    coco_url = f"{base_url}/api/v1/project/{project_id}/collection-configurations"
+    set_auth_token(auth_token)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        wf_future = executor.submit(_get_json, workflows_url)
+        coco_future = executor.submit(_get_json, coco_url)
 
     try:
-        wf_resp = requests.get(workflows_url, headers=headers)
-        wf_resp.raise_for_status()
-        workflow_data = wf_resp.json()
+        workflow_data = wf_future.result()
     except requests.RequestException as e:
         print(f"Failed to retrieve workflow phases: {e}")
         return []
 
-    # Ensure we have a list of workflows
-    if isinstance(workflow_data, dict):
-        workflow_data = [workflow_data]
-
-    # Step 3: Extract only phases whose type.name is in our target list
-    matched_phases = []
-    for workflow in workflow_data:
-        for phase in workflow.get("phases", []):
-            phase_type = phase.get("type", {})
-            type_name = phase_type.get("name")
-            if type_name in TARGET_PHASE_TYPES:
-                matched_phases.append({
-                    "id": phase["id"],
-                    "name": phase["name"],
-                    "phaseType": type_name,
-                })
-
-    # Step 4: Fetch collection configurations
-    coco_url = f"{base_url}/api/v1/project/{project_id}/collection-configurations"
+    # The endpoint normally returns a list of workflows, but may return a single one
+    workflows = workflow_data if isinstance(workflow_data, list) else (workflow_data,)
+
+    # Step 3: Index collection configurations by phase ID.
+    # The server keys them by phase ID as a string, e.g. {"1864": {...}, "1866": {...}}
     try:
-        coco_resp = requests.get(coco_url, headers=headers)
-        coco_resp.raise_for_status()
-        coco_map = coco_resp.json()  # e.g., {"1864": {...}, "1866": {...}, ...}
+        coco_map = coco_future.result()
     except requests.RequestException as e:
+        # Phases are still returned, just without a known CoCo ID
         print(f"Failed to retrieve collection configurations: {e}")
-        return matched_phases  # Return at least the phases we found
-
-    # Step 5: Merge them into a single structure
-    for phase_info in matched_phases:
-        phase_key = str(phase_info["id"])  # Convert to string for dictionary lookup
-        if phase_key in coco_map:
-            phase_info["collectionConfigurationId"] = coco_map[phase_key].get("id")
-        else:
-            phase_info["collectionConfigurationId"] = None
-
-    # Step 6: Optionally write to JSON
+        coco_map = {}
+    if not isinstance(coco_map, dict):
+        # e.g. [] when the project has no CoCos yet; treated like a failed request
+        coco_map = {}
+    # Keys that are not phase IDs are skipped; they could never match a phase anyway
+    coco_by_phase_id = {int(key): coco.get("id") for key, coco in coco_map.items() if key.isdecimal()}
+
+    # Step 4: Extract only phases whose type.name is in our target list
+    matched_phases = [
+        {
+            "id": phase["id"],
+            "name": phase["name"],
+            "phaseType": type_name,
+            "collectionConfigurationId": coco_id,
+        }
+        for workflow in workflows
+        for phase in workflow.get("phases", ())
+        # 'type' may be missing or null; the {} fallback is only built in that case
+        if (type_name := (phase.get("type") or {}).get("name")) in TARGET_PHASE_TYPES
+        and ((coco_id := coco_by_phase_id.get(phase["id"])) is None or not only_null_coco)
+    ]
+
+    # Step 5: Optionally write to JSON
     if output_file:
         try:
             with open(output_file, "w", encoding="utf-8") as f:
@@ -150,6 +145,13 @@ def get_phases_with_coco(project_id=None, output_file=None):
     return matched_phases
 
 
+def _get_json(url):
+    """ GETs 'url' on the shared session and returns the decoded JSON body. """
+    resp = SESSION.get(url)
+    check_status(resp)
+    return decode_json(resp)
+
+
 # Optional main routine for testing
 if __name__ == "__main__":
     # Optionally specify a project ID here or rely on .env for PROJECT_ID
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+http_client.py
+
+Shared HTTP session for every call made to the QTM backend.
+
+All requests in a run (login, workflows, collection configurations,
+users/me/projects and the final PUT) go to the same host, so they share a
+single requests.Session. This keeps the TCP/TLS connection alive between
+calls instead of paying a fresh handshake for each one.
+
+JSON bodies (request and response) are handled with orjson when it is
+installed, falling back to the standard library json module otherwise.
+
+When CacheControl is installed, GETs of a project's workflows and of
+users/me/projects (CACHED_GET_PATH_RE) keep responses that carry an ETag in
+HTTP_CACHE_DIR, unless the server sends no-store. They are always revalidated
+with If-None-Match (never served from disk unchecked), so an unchanged
+resource comes back as a body-less 304 and the server still checks the
+current Authorization header on every request. All other URLs bypass the cache.
+"""
+
+import json
+import re
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from cachecontrol import CacheControlAdapter
+    from cachecontrol.caches.file_cache import FileCache
+    from cachecontrol.heuristics import BaseHeuristic
+except ImportError:  # CacheControl is optional
+    CacheControlAdapter = None
+
+try:
+    from orjson import OPT_INDENT_2, dumps as _orjson_dumps, loads as json_loads
+except ImportError:  # orjson is optional
+    _orjson_dumps = None
+    from json import loads as json_loads
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/131.0.0.0 Safari/537.36 Edg/131.0.0.0"
+)
+
+HTTP_CACHE_DIR = ".http_cache"
+
+# Read-only GET endpoints that may be served from the revalidating cache. Collection
+# configurations are deliberately not listed: they decide which phases are eligible.
+CACHED_GET_PATH_RE = re.compile(r"^/api/v1/(?:project/\d+/workflows|users/me/projects)$")
+
+
+if CacheControlAdapter is not None:
+    class _AlwaysRevalidate(BaseHeuristic):
+        """
+        Overrides the server's freshness headers with max-age=0, so a cached entry is
+        never reused without a conditional request (it is kept because of its ETag).
+        """
+
+        def update_headers(self, response):
+            if "no-store" in response.headers.get("cache-control", ""):
+                return {}  # leave it to CacheControl, which then does not store it
+            return {"cache-control": "max-age=0"}
+
+        def warning(self, response):
+            return None
+
+
+def _make_cache_adapter():
+    """ On-disk revalidating cache adapter, or None if CacheControl (or filelock) is missing. """
+    if CacheControlAdapter is None:
+        return None
+    try:
+        return CacheControlAdapter(
+            cache=FileCache(HTTP_CACHE_DIR),
+            heuristic=_AlwaysRevalidate(),
+            pool_connections=4,
+            pool_maxsize=16,
+        )
+    except ImportError:  # FileCache needs the 'filelock' package
+        return None
+
+
+class _PathCachingAdapter(HTTPAdapter):
+    """
+    Sends GETs whose path matches CACHED_GET_PATH_RE through 'cache_adapter' and
+    everything else through its own plain pool. The choice is made per request, so
+    the session's adapter table never has to change while requests are in flight.
+    """
+
+    def __init__(self, cache_adapter, **kwargs):
+        super().__init__(**kwargs)
+        self._cache_adapter = cache_adapter
+
+    def send(self, request, **kwargs):
+        if request.method == "GET" and CACHED_GET_PATH_RE.match(urlsplit(request.url).path):
+            return self._cache_adapter.send(request, **kwargs)
+        return super().send(request, **kwargs)
+
+    def close(self):
+        super().close()
+        self._cache_adapter.close()
+
+
+def _make_adapter():
+    """ Connection-pooling adapter, caching the CACHED_GET_PATH_RE GETs if CacheControl is available. """
+    cache_adapter = _make_cache_adapter()
+    if cache_adapter is None:
+        return HTTPAdapter(pool_connections=4, pool_maxsize=16)
+    return _PathCachingAdapter(cache_adapter, pool_connections=4, pool_maxsize=16)
+
+
+SESSION = requests.Session()
+SESSION.mount("https://", _make_adapter())
+SESSION.headers.update({
+    "User-Agent": USER_AGENT,
+    "Accept": "application/json, text/plain, */*",
+})
+
+
+def set_auth_token(token):
+    """
+    Sends 'token' as the Bearer token on every following request, so callers
+    do not have to build an Authorization header per call.
+    """
+    SESSION.headers["Authorization"] = f"Bearer {token}"
+
+
+def check_status(resp):
+    """
+    Raises for 4xx/5xx responses. Successful responses only cost one integer compare.
+
+    Raises:
+        requests.HTTPError: If the response status code is 400 or above.
+    """
+    if resp.status_code >= 400:
+        resp.raise_for_status()
+
+
+def encode_json(payload, pretty=False):
+    """
+    Serializes 'payload' to UTF-8 JSON bytes: compact for request bodies, or
+    indented by two spaces when 'pretty' is set (e.g. for files meant to be read).
+    """
+    if _orjson_dumps is not None:
+        return _orjson_dumps(payload, option=OPT_INDENT_2 if pretty else None)
+    if pretty:
+        return json.dumps(payload, indent=2).encode("utf-8")
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def decode_json(resp):
+    """
+    Decodes the JSON body of 'resp' straight from its raw bytes.
+
+    Raises:
+        requests.JSONDecodeError: If the body is not valid JSON (same as resp.json()).
+    """
+    try:
+        return json_loads(resp.content)
+    except json.JSONDecodeError as e:
+        raise requests.JSONDecodeError(e.msg, e.doc, e.pos, response=resp) from e
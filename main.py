@@ -3,29 +3,77 @@
 main.py
 
 Coordinates the entire flow:
-  1. Authenticates to the QTM QA environment (saving token to .env).
+  1. Authenticates to the QTM QA environment (keeping the token in memory).
   2. Prompts for the workflowPhaseId and transforms the JSON.
   3. Sends the PUT request.
+  4. Saves the token to .env for later runs.
 
 Usage:
     python main.py
+    python main.py --phase-id 1866 --yes    (non-interactive)
+
+Options:
+    --project-id ID       Project to work with (default: PROJECT_ID from .env).
+    --phase-id ID         Phase to configure; skips the phase prompt.
+    --yes                 Skips the "Is this correct?" confirmation.
+    --existing-coco PATH  Server-style CoCo JSON to clone
+                          (default: existingCoCoServerResponse.json).
+    --skip-auth           Skips logging in and uses AUTH_TOKEN from .env
+                          (e.g. when MFA is enabled on your account).
 """
 
-from authenticate import authenticate_and_save_token
+import argparse
+
+from authenticate import authenticate, save_token
 from request_manager import prompt_and_send_put
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Clone an existing CoCo into a workflow phase.")
+    parser.add_argument("--project-id", type=int, help="project ID (default: PROJECT_ID from .env)")
+    parser.add_argument("--phase-id", type=int, help="phase to configure; skips the phase prompt")
+    parser.add_argument("-y", "--yes", action="store_true", help="skip the confirmation prompt")
+    parser.add_argument(
+        "--existing-coco",
+        default="existingCoCoServerResponse.json",
+        help="server-style CoCo JSON to clone (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--skip-auth",
+        action="store_true",
+        help="don't log in; use AUTH_TOKEN from .env (e.g. if MFA is enabled)",
+    )
+    return parser.parse_args(argv)
+
 def main():
-    # Comment out the authentication call if you don't have MFA disabled on your account.
-    # You will have to manually paste the token into the .env file.
-    print("\n--- 1) Authenticating ---")
-    try:
-        authenticate_and_save_token()
-    except Exception as auth_err:
-        print(f"Authentication failed: {auth_err}")
-        return
+    args = parse_args()
+
+    # Use --skip-auth (or comment out the authentication call) if you don't have MFA disabled
+    # on your account. You will have to manually paste the token into the .env file;
+    # prompt_and_send_put() falls back to AUTH_TOKEN from .env when it is not given a token.
+    auth_token = None
+    if args.skip_auth:
+        print("\n--- 1) Skipping authentication; using AUTH_TOKEN from .env ---")
+    else:
+        print("\n--- 1) Authenticating ---")
+        try:
+            auth_token = authenticate()
+        except Exception as auth_err:
+            print(f"Authentication failed: {auth_err}")
+            return
 
     print("\n--- 2 & 3) Prompt and Send PUT Request ---")
-    prompt_and_send_put()
+    prompt_and_send_put(
+        auth_token=auth_token,
+        project_id=args.project_id,
+        phase_id=args.phase_id,
+        assume_yes=args.yes,
+        existing_coco_file=args.existing_coco,
+    )
+
+    # Persisting the token is not needed for this run, so do it last
+    # (and only if this run actually obtained a new one)
+    if auth_token:
+        save_token(auth_token)
 
 if __name__ == "__main__":
     main()
@@ -6,27 +6,54 @@ Adds verbose logging to diagnose potential mismatches between the
 provided "existingCoCoServerResponse.json" and the final payload.
 """
 
-import os
+import sys
 import json
-import datetime
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
-from dotenv import load_dotenv
 
+from config import BASE_URL, CFG
+from http_client import SESSION, check_status, decode_json, encode_json, set_auth_token
 from getCollectionConfigurations import get_phases_with_coco
-from transform import transform_server_response_to_minimal
-
-ENVIRONMENTS = {
-    "qa": "https://qtm-backend-qa.azurewebsites.net",
-    "staging": "https://qtm-backend-staging.azurewebsites.net",
-    "prod": "https://qtm-backend.azurewebsites.net"
-}
-
-def prompt_and_send_put():
-    load_dotenv()
-    auth_token = os.getenv("AUTH_TOKEN")
-    environment_name = os.getenv("QTM_ENVIRONMENT", "qa").lower().strip()
-    base_url = ENVIRONMENTS.get(environment_name)
-    project_id_str = os.getenv("PROJECT_ID")
+from transform import transform_server_response_to_json_bytes
+
+# Timestamped logger, configured once: "[YYYY-mm-dd HH:MM:SS] [request_manager] message"
+_logger = logging.getLogger("request_manager")
+if not _logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("[%(asctime)s] [%(name)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"))
+    _logger.addHandler(_handler)
+    _logger.setLevel(logging.INFO)
+    _logger.propagate = False
+
+# Project names seen so far, keyed by base URL and then by project ID
+PROJECT_NAME_CACHE_FILE = ".project_name_cache.json"
+
+def prompt_and_send_put(
+    auth_token=None,
+    project_id=None,
+    phase_id=None,
+    assume_yes=False,
+    existing_coco_file="existingCoCoServerResponse.json"
+):
+    """
+    Prompts for a phase without a CoCo, transforms the existing CoCo and PUTs it.
+
+    Args:
+        auth_token (str): Bearer token from authenticate(). If None, uses AUTH_TOKEN from .env.
+        project_id (int): The project ID. If None, uses PROJECT_ID from .env.
+        phase_id (int): The phase to configure. If given, the phase prompt is skipped,
+            but the phase must still be eligible (no existing CoCo).
+        assume_yes (bool): If True, skips the "Is this correct?" confirmation.
+        existing_coco_file (str): The server-style CoCo JSON to clone.
+    """
+    if auth_token is None:
+        auth_token = CFG.auth_token
+    environment_name = CFG.environment
+    base_url = BASE_URL
+    project_id_str = CFG.project_id if project_id is None else str(project_id)
 
     log(f"Starting prompt_and_send_put with environment='{environment_name}' and project_id='{project_id_str}'")
 
@@ -40,102 +67,115 @@ def prompt_and_send_put():
         log("ERROR: PROJECT_ID not set in .env. Aborting.")
         return
 
+    set_auth_token(auth_token)
+
     try:
         project_id = int(project_id_str)
     except ValueError:
         log(f"ERROR: PROJECT_ID in .env is not a valid integer: {project_id_str}")
         return
 
-    # Step 1: Fetch phases
-    log("Fetching phases via get_phases_with_coco...")
-    all_phases = get_phases_with_coco(project_id=project_id)
-    if not all_phases:
-        log("ERROR: No phases returned, or an error occurred. Aborting.")
-        return
+    # The project name is only needed for the confirmation. Look it up in the
+    # background so it overlaps with the phase fetch and the user's choice; the
+    # executor is shut down right away but still finishes this one lookup.
+    executor = ThreadPoolExecutor(max_workers=1)
+    project_name_future = executor.submit(get_project_name, base_url, project_id)
+    executor.shutdown(wait=False)
 
-    # Filter only those with null CoCo
-    eligible_phases = [p for p in all_phases if p.get("collectionConfigurationId") is None]
+    # Step 1: Fetch phases (workflows and CoCos are fetched concurrently too)
+    log("Fetching phases via get_phases_with_coco...")
+    # Only phases with a null CoCo are eligible; they are filtered while being extracted
+    eligible_phases = get_phases_with_coco(project_id=project_id, auth_token=auth_token, only_null_coco=True)
     log(f"Found {len(eligible_phases)} eligible phases (collectionConfigurationId == null).")
 
     if not eligible_phases:
-        log("No eligible phases found. Aborting.")
+        log("No eligible phases found, or an error occurred. Aborting.")
         return
 
-    # List them out
-    log("Listing eligible phases:")
-    for p in eligible_phases:
-        log(f" -> ID={p['id']} Name='{p['name']}' PhaseType='{p['phaseType']}'")
-
-    # Prompt
-    selected_phase = None
-    while not selected_phase:
-        choice_str = input("Enter the ID of the phase to configure: ").strip()
-        try:
-            choice_id = int(choice_str)
-        except ValueError:
-            log("Invalid integer. Try again.")
-            continue
-
-        found = next((ph for ph in eligible_phases if ph['id'] == choice_id), None)
-        if not found:
-            log(f"No eligible phase with ID={choice_id}. Please pick from the listed IDs.")
-        else:
-            selected_phase = found
+    if phase_id is None:
+        # List them out
+        log("Listing eligible phases:")
+        for p in eligible_phases:
+            log(f" -> ID={p['id']} Name='{p['name']}' PhaseType='{p['phaseType']}'")
+
+        # Prompt
+        selected_phase = prompt_for_phase(eligible_phases)
+    else:
+        selected_phase = next((ph for ph in eligible_phases if ph['id'] == phase_id), None)
+        if not selected_phase:
+            log(f"ERROR: Phase ID={phase_id} is not an eligible phase (unknown, or it already has a CoCo). Aborting.")
+            return
+    project_name = project_name_future.result()
 
     phase_id = selected_phase["id"]
     phase_name = selected_phase["name"]
     log(f"User selected phase_id={phase_id}, name='{phase_name}'")
 
     # Confirm
-    from request_manager import get_project_name  # or define inline
-    project_name = get_project_name(base_url, auth_token, project_id)
     log(f"Project name from /users/me/projects: '{project_name}'")
 
     print(f"You have selected phase ID = {phase_id}, Name = '{phase_name}' for project '{project_name}' (ID={project_id}).")
-    confirm = input("Is this correct? (Y/N): ").strip().lower()
-    if confirm not in ("y", "yes"):
-        log("User canceled operation.")
-        return
+    if assume_yes:
+        log("Confirmation skipped (--yes).")
+    else:
+        confirm = input("Is this correct? (Y/N): ").strip().lower()
+        if confirm not in ("y", "yes"):
+            log("User canceled operation.")
+            return
 
     # Step 2: Transform
     # (Here is the crucial part where you specify the file to read)
-    existing_coco_file = "existingCoCoServerResponse.json"
     log(f"Starting transformation from file='{existing_coco_file}' with workflowPhaseId={phase_id}")
-    minimal_payload = transform_server_response_to_minimal(
+    # The payload comes back already JSON-encoded, since it is only sent on as the PUT body
+    minimal_payload = transform_server_response_to_json_bytes(
         workflow_phase_id=phase_id,
         existing_coco_path=existing_coco_file,
         debug_log=False  # set to True to see logs from transform.py
     )
 
     if not minimal_payload:
-        log("ERROR: transform_server_response_to_minimal() returned None. Aborting.")
+        log("ERROR: transform_server_response_to_json_bytes() returned None. Aborting.")
         return
 
-    # Optionally preview
-    log("Transformation completed. Minimal payload top-level keys:")
-    for key in minimal_payload.keys():
-        log(f"   -> {key}")
+    log(f"Transformation completed. Minimal payload is {len(minimal_payload)} bytes.")
 
     # Step 3: PUT
-    put_collection_configuration(minimal_payload, base_url, auth_token)
+    put_collection_configuration(minimal_payload, base_url)
 
-def put_collection_configuration(payload, base_url, auth_token):
+def prompt_for_phase(eligible_phases):
+    """ Asks for a phase ID until it matches one of 'eligible_phases'. """
+    while True:
+        choice_str = input("Enter the ID of the phase to configure: ").strip()
+        try:
+            choice_id = int(choice_str)
+        except ValueError:
+            log("Invalid integer. Try again.")
+            continue
+
+        found = next((ph for ph in eligible_phases if ph['id'] == choice_id), None)
+        if not found:
+            log(f"No eligible phase with ID={choice_id}. Please pick from the listed IDs.")
+        else:
+            return found
+
+def put_collection_configuration(payload, base_url):
+    """
+    PUTs 'payload' (a dict, or JSON that is already encoded to bytes) using the
+    token already set on the shared session.
+    """
     url = f"{base_url}/api/v1/collection-configurations"
-    headers = {
-        "Authorization": f"Bearer {auth_token}",
-        "Content-Type": "application/json",
-        "Accept": "application/json, text/plain, */*",
-        "User-Agent": "Mozilla/5.0"
-    }
+    # Authorization/Accept/User-Agent come from the session; only the body type is per-call
+    headers = {"Content-Type": "application/json"}
 
     log(f"Sending PUT to: {url}")
     try:
-        resp = requests.put(url, headers=headers, json=payload)
-        resp.raise_for_status()
-        data = resp.json()
+        body = payload if isinstance(payload, bytes) else encode_json(payload)
+        resp = SESSION.put(url, headers=headers, data=body)
+        check_status(resp)
+        data = decode_json(resp)
         # Save to response.json
-        with open("response.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+        with open("response.json", "wb") as f:
+            f.write(encode_json(data, pretty=True))
         log("SUCCESS: PUT returned 2xx. Saved to 'response.json'.")
     except requests.RequestException as e:
         log(f"PUT request failed: {e}")
@@ -143,28 +183,51 @@ def put_collection_configuration(payload, base_url, auth_token):
             log(f"Response status code: {e.response.status_code}")
             log(f"Response text: {e.response.text}")
 
-def get_project_name(base_url, auth_token, project_id):
-    """ Same function from your script. """
+@functools.lru_cache(maxsize=32)
+def get_project_name(base_url, project_id):
+    """
+    Returns the name of 'project_id', or None if it cannot be found.
+
+    Project names rarely change, so they are cached on disk in
+    PROJECT_NAME_CACHE_FILE and /users/me/projects is only called on a miss.
+    A successful call caches the names of every project it returned.
+    Uses the token already set on the shared session.
+    """
+    cache = _read_project_name_cache()
+    name = cache.get(base_url, {}).get(str(project_id))
+    if name is not None:
+        return name
+
     url = f"{base_url}/api/v1/users/me/projects"
-    headers = {
-        "Authorization": f"Bearer {auth_token}",
-        "Accept": "application/json, text/plain, */*",
-        "User-Agent": "Mozilla/5.0"
-    }
     try:
-        r = requests.get(url, headers=headers)
-        r.raise_for_status()
-        projects = r.json()
+        r = SESSION.get(url)
+        check_status(r)
+        projects = decode_json(r)
         if not isinstance(projects, list):
             return None
-        for pr in projects:
-            if pr.get("id") == project_id:
-                return pr.get("name")
-        return None
     except requests.RequestException:
         return None
 
+    names_by_id = {str(pr.get("id")): pr.get("name") for pr in projects}
+    cache[base_url] = names_by_id
+    _write_project_name_cache(cache)
+    return names_by_id.get(str(project_id))
+
+def _read_project_name_cache():
+    try:
+        with open(PROJECT_NAME_CACHE_FILE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (IOError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+def _write_project_name_cache(cache):
+    try:
+        with open(PROJECT_NAME_CACHE_FILE, "w", encoding="utf-8") as f:
+            json.dump(cache, f)
+    except IOError as e:
+        log(f"Could not write {PROJECT_NAME_CACHE_FILE}: {e}")
+
 def log(message):
     """ Utility for timestamped logs. """
-    now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[{now_str}] [request_manager] {message}")
+    _logger.info(message)
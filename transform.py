@@ -9,17 +9,54 @@ Reads the server-style CoCo JSON from `existingCoCoServerResponse.json`
 Also updates parentModuleId references and rules, if applicable.
 """
 
+import re
 import json
 import random
 import os
-import datetime
+import time
+from itertools import islice
+from typing import Any, Iterator, Optional
+
+try:
+    from orjson import dumps as _orjson_dumps, loads as json_loads
+except ImportError:  # orjson is optional; fall back to the standard library parser
+    _orjson_dumps = None  # type: ignore[assignment]
+    from json import loads as json_loads  # type: ignore[assignment]
+
+try:
+    import ijson  # type: ignore[import-not-found, import-untyped]
+except ImportError:  # ijson is optional; without it the file is always read whole
+    ijson = None
+
+# Rule parameters that reference a module look like "module|<workflowPhaseId>.<moduleId>"
+_MODULE_PARAM_RE = re.compile(r"^module\|\d+\.(\d+)$")
+
+# Every minimal module is a copy of this prototype. Copying reuses its key table
+# (keys, hashes, order) instead of inserting the seven keys into a new dict each time.
+_MODULE_TEMPLATE: dict[str, Any] = {
+    "id": None,
+    "moduleId": None,
+    "projectId": 23,  # or derive from file if needed
+    "type": None,
+    "ordinal": None,
+    "meta": None,
+    "rules": None
+}
+
+# Server responses of at least this size are streamed when stream=None
+_STREAM_MIN_BYTES = 64 * 1024 * 1024
+
+# ijson prefixes inside the server response
+_CONFIG_PREFIX = "phaseCollectionConfigurations.item"
+_MODULE_PREFIX = _CONFIG_PREFIX + ".modules.item"
 
 def transform_server_response_to_minimal(
-    workflow_phase_id,
-    existing_coco_path="existingCoCoServerResponse.json",
+    workflow_phase_id: int,
+    existing_coco_path: str = "existingCoCoServerResponse.json",
     # set to true if you want really detailed logs on why your shit is broken
-    debug_log=True
-):
+    debug_log: bool = True,
+    stream: Optional[bool] = None
+) -> Optional[dict[str, Any]]:
     """
     Reads a server-style CoCo JSON from 'existing_coco_path' and constructs a minimal payload.
     
@@ -27,81 +64,117 @@ def transform_server_response_to_minimal(
         workflow_phase_id (int): The workflow phase ID provided by the user.
         existing_coco_path (str): The path to the JSON file with the server response.
         debug_log (bool): If True, prints verbose debug statements.
+        stream (bool): If True, stream the modules from the file with ijson instead of
+            loading it whole. None (default) streams only files of _STREAM_MIN_BYTES or more.
 
     Returns:
         dict: A Python dictionary containing the minimal payload with ephemeral IDs.
     """
-    if debug_log:
-        print(f"[{timestamp()}] [transform.py] -> Starting transform_server_response_to_minimal()")
-        print(f"[{timestamp()}] [transform.py] -> Attempting to read: '{existing_coco_path}'")
-        print(f"[{timestamp()}] [transform.py] -> Using workflowPhaseId: {workflow_phase_id}")
-
-    # 1) Read the original server JSON
-    server_json = None
-    try:
-        with open(existing_coco_path, "r", encoding="utf-8") as f:
-            server_json = json.load(f)
-    except (IOError, json.JSONDecodeError) as e:
-        if debug_log:
-            print(f"[{timestamp()}] [transform.py] ERROR reading file '{existing_coco_path}': {e}")
-        return None
+    # Chosen once; per-module messages are additionally guarded so that their
+    # f-strings are never built (and `python -O` drops them) when logging is off.
+    log = _log if debug_log else _noop
 
-    if debug_log:
-        print(f"[{timestamp()}] [transform.py] -> Successfully read '{existing_coco_path}'.")
+    log("-> Starting transform_server_response_to_minimal()")
+    log(f"-> Attempting to read: '{existing_coco_path}'")
+    log(f"-> Using workflowPhaseId: {workflow_phase_id}")
+
+    # 1) Read the original server JSON. Large files are streamed with ijson (if installed)
+    #    so that only one module at a time is held in memory instead of the whole document.
+    if stream is None:
+        try:
+            stream = ijson is not None and os.path.getsize(existing_coco_path) >= _STREAM_MIN_BYTES
+        except OSError:
+            stream = False
+    elif stream and ijson is None:
+        log("-> ijson is not installed; reading the whole file instead of streaming.")
+        stream = False
+
+    if stream:
+        try:
+            first_config = _scan_first_config(existing_coco_path)
+        except (IOError, ijson.JSONError) as e:
+            log(f"ERROR reading file '{existing_coco_path}': {e}")
+            return None
+        if first_config is None:
+            log("-> 'phaseCollectionConfigurations' missing or empty. Cannot proceed.")
+            return None
+        log(f"-> Successfully scanned '{existing_coco_path}'; modules will be streamed.")
+
+        module_total = first_config["moduleCount"]
+        server_modules = _iter_first_config_modules(existing_coco_path, module_total)
+        old_ids = first_config["moduleIds"]
+    else:
+        server_json = None
+        try:
+            with open(existing_coco_path, "rb") as f:
+                server_json = json_loads(f.read())
+        except (IOError, json.JSONDecodeError) as e:
+            log(f"ERROR reading file '{existing_coco_path}': {e}")
+            return None
+
+        log(f"-> Successfully read '{existing_coco_path}'.")
         # Optionally dump the entire file for debugging:
-        # print(f"[{timestamp()}] [transform.py] -> server_json content:\n{json.dumps(server_json, indent=2)}\n")
-
-    # 2) Extract modules. This depends on your file’s structure. For example:
-    #    Possibly inside: server_json["modules"] or server_json["phaseCollectionConfigurations"][0]["modules"]
-    #    We'll demonstrate your sample structure:
-    phase_collection_configs = server_json.get("phaseCollectionConfigurations", [])
-    if not phase_collection_configs or not isinstance(phase_collection_configs, list):
-        if debug_log:
-            print(f"[{timestamp()}] [transform.py] -> 'phaseCollectionConfigurations' missing or empty. Cannot proceed.")
-        return None
+        # log(f"-> server_json content:\n{json.dumps(server_json, indent=2)}\n")
+
+        # 2) Extract modules. This depends on your file’s structure. For example:
+        #    Possibly inside: server_json["modules"] or server_json["phaseCollectionConfigurations"][0]["modules"]
+        #    We'll demonstrate your sample structure:
+        phase_collection_configs = server_json.get("phaseCollectionConfigurations", [])
+        if not phase_collection_configs or not isinstance(phase_collection_configs, list):
+            log("-> 'phaseCollectionConfigurations' missing or empty. Cannot proceed.")
+            return None
+
+        # For demonstration, we assume you want the first item in the array (or merge multiple?)
+        # We'll take the first item for this example:
+        first_config = phase_collection_configs[0]
+        server_modules = first_config.get("modules", [])
+        module_total = len(server_modules)
+        old_ids = [module_id for mod in server_modules if (module_id := mod.get("moduleId")) is not None]
 
-    # For demonstration, we assume you want the first item in the array (or merge multiple?)
-    # We'll take the first item for this example:
-    first_config = phase_collection_configs[0]
-    server_modules = first_config.get("modules", [])
     if debug_log:
         config_id = first_config.get("id", "Unknown ID")
         project_id_from_file = first_config.get("projectId", "N/A")
-        print(f"[{timestamp()}] [transform.py] -> Found config ID: {config_id}, projectId in JSON: {project_id_from_file}")
-        print(f"[{timestamp()}] [transform.py] -> Number of modules: {len(server_modules)}")
+        log(f"-> Found config ID: {config_id}, projectId in JSON: {project_id_from_file}")
+        log(f"-> Number of modules: {module_total}")
 
-    # 3) Build a dictionary of old module IDs -> ephemeral IDs
-    old_to_new_id_map = {}
-    for mod in server_modules:
-        old_id = mod.get("moduleId")
-        if old_id is not None:
-            ephemeral_id = random.randint(100000, 999999)
-            old_to_new_id_map[old_id] = ephemeral_id
-            if debug_log:
-                print(f"[{timestamp()}] [transform.py] -> Mapping old moduleId {old_id} -> ephemeral {ephemeral_id}")
+    # 3) Build a dictionary of old module IDs -> ephemeral IDs.
+    #    All IDs are drawn in one random.sample() call, which also guarantees they are unique.
+    new_ids = random.sample(range(100000, 1000000), len(old_ids))
+    old_to_new_id_map: dict[Any, int] = dict(zip(old_ids, new_ids))
+    if __debug__ and debug_log:
+        for old_id, new_id in old_to_new_id_map.items():
+            log(f"-> Mapping old moduleId {old_id} -> ephemeral {new_id}")
 
     # 4) Construct final minimal payload
-    final_payload = {
+    final_payload: dict[str, Any] = {
         "workflowPhaseId": workflow_phase_id,
         "isLocationCollectionConfiguration": False,
         "modules": []
     }
 
-    # 5) Populate new modules
+    # The same "module|..." references recur across many rules; each distinct one is
+    # rewritten once per call and looked up afterwards.
+    rewritten_params: dict[str, str] = {}
+
+    # 5) Populate new modules into a list pre-sized to the number of server modules
+    modules: list[Any] = [None] * module_total
+    module_count = 0
     for mod in server_modules:
-        old_module_id = mod.get("moduleId")
-        if old_module_id not in old_to_new_id_map:
+        # basic fields, each looked up once; an empty () for missing rules skips the rules loop
+        old_module_id, mod_type, ordinal, meta, rules = (
+            mod.get("moduleId"),
+            mod.get("type", "Text"),
+            mod.get("ordinal", 0),
+            mod.get("meta") or {},
+            mod.get("rules") or (),
+        )
+
+        ephemeral_id = old_to_new_id_map.get(old_module_id)
+        if ephemeral_id is None:
             # Possibly this module has no valid ID -> skip or handle specially
-            if debug_log:
-                print(f"[{timestamp()}] [transform.py] -> Skipping module with old_module_id={old_module_id} not in map.")
+            if __debug__ and debug_log:
+                log(f"-> Skipping module with old_module_id={old_module_id} not in map.")
             continue
-
-        ephemeral_id = old_to_new_id_map[old_module_id]
-
-        # basic fields
-        mod_type = mod.get("type", "Text")
-        ordinal = mod.get("ordinal", 0)
-        meta = mod.get("meta", {})
         
         # Remap meta.parentModuleId if needed
         old_parent_id = meta.get("parentModuleId")
@@ -109,31 +182,170 @@ def transform_server_response_to_minimal(
         if old_parent_id and old_parent_id in old_to_new_id_map:
             new_parent_id = old_to_new_id_map[old_parent_id]
 
-        new_meta = dict(meta)
-        new_meta["parentModuleId"] = new_parent_id
+        # Objects that need no change are shared with server_json instead of copied;
+        # server_json is not used again once the payload is built.
+        if old_parent_id is None and "parentModuleId" in meta:
+            new_meta = meta
+        else:
+            new_meta = dict(meta)
+            new_meta["parentModuleId"] = new_parent_id
 
-        # If you have rules to transform, do that here similarly
+        # Copy rules, pointing "module|..." condition parameters and meta.parentModuleId at the
+        # new phase and ephemeral IDs (or dropping the parent if it is not among the copied modules)
+        new_rules: list[Any] = []
+        for rule in rules:
+            new_conditions: list[Any] = []
+            rule_changed = False
+            rule_meta = rule.get("meta")
+            if rule_meta and rule_meta.get("parentModuleId") is not None:
+                new_rule_meta = dict(rule_meta)
+                new_rule_meta["parentModuleId"] = old_to_new_id_map.get(rule_meta["parentModuleId"])
+                rule_changed = True
+            else:
+                new_rule_meta = rule_meta
+            for condition in rule.get("conditions") or ():
+                parameters = condition.get("parameters") or ()
+                # JSON parsers only produce exact str objects, so "type(p) is str" is enough to
+                # skip numbers/nulls; the slice compare then needs no method lookup.
+                if not any(type(p) is str and p[:7] == "module|" for p in parameters):
+                    new_conditions.append(condition)
+                    continue
+                new_params = [
+                    (rewritten_params.get(param)
+                     or rewritten_params.setdefault(param, _transform_rule_parameter(param, workflow_phase_id, old_to_new_id_map)))
+                    if type(param) is str and param[:7] == "module|" else param
+                    for param in parameters
+                ]
+                new_condition = dict(condition)
+                new_condition["parameters"] = new_params
+                new_conditions.append(new_condition)
+                rule_changed = True
+            if rule_changed:
+                new_rule = dict(rule)
+                if "meta" in rule:
+                    new_rule["meta"] = new_rule_meta
+                if "conditions" in rule:
+                    new_rule["conditions"] = new_conditions
+                new_rules.append(new_rule)
+            else:
+                new_rules.append(rule)
 
-        minimal_module = {
-            "id": ephemeral_id,
-            "moduleId": ephemeral_id,
-            "projectId": 23,  # or derive from file if needed
-            "type": mod_type,
-            "ordinal": ordinal,
-            "meta": new_meta,
-            "rules": []  # or transform from mod["rules"] if needed
-        }
+        minimal_module = _MODULE_TEMPLATE.copy()
+        minimal_module["id"] = ephemeral_id
+        minimal_module["moduleId"] = ephemeral_id
+        minimal_module["type"] = mod_type
+        minimal_module["ordinal"] = ordinal
+        minimal_module["meta"] = new_meta
+        minimal_module["rules"] = new_rules
 
-        if debug_log:
-            print(f"[{timestamp()}] [transform.py] -> Created minimal module ephemeral_id={ephemeral_id} from old_id={old_module_id}")
+        if __debug__ and debug_log:
+            log(f"-> Created minimal module ephemeral_id={ephemeral_id} from old_id={old_module_id} with {len(new_rules)} rules")
 
-        final_payload["modules"].append(minimal_module)
+        modules[module_count] = minimal_module
+        module_count += 1
 
-    if debug_log:
-        print(f"[{timestamp()}] [transform.py] -> Finished constructing final payload with {len(final_payload['modules'])} modules.")
+    del modules[module_count:]  # drop the slots of skipped modules
+    final_payload["modules"] = modules
+
+    log(f"-> Finished constructing final payload with {len(final_payload['modules'])} modules.")
 
     return final_payload
 
-def timestamp():
-    """ Helper for consistent time-based logging. """
-    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def transform_server_response_to_json_bytes(
+    workflow_phase_id: int,
+    existing_coco_path: str = "existingCoCoServerResponse.json",
+    debug_log: bool = True,
+    stream: Optional[bool] = None
+) -> Optional[bytes]:
+    """
+    Same as transform_server_response_to_minimal(), but returns the payload already
+    serialized as compact UTF-8 JSON, ready to be sent or written to disk.
+
+    The modules share their meta/rules objects with the parsed server JSON, so the
+    payload dict is only a thin layer; it is serialized (with orjson when installed)
+    and released in the same call instead of being handed back to the caller.
+
+    Returns:
+        bytes: The JSON-encoded minimal payload, or None if the transform failed.
+    """
+    payload = transform_server_response_to_minimal(workflow_phase_id, existing_coco_path, debug_log, stream)
+    if payload is None:
+        return None
+    if _orjson_dumps is not None:
+        return _orjson_dumps(payload)
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+def _scan_first_config(existing_coco_path: str) -> Optional[dict[str, Any]]:
+    """
+    First streaming pass over the server response. Collects what is needed before
+    the modules can be transformed, without building any module objects.
+
+    Returns:
+        dict: "id" and "projectId" of the first phaseCollectionConfigurations entry,
+              plus its "moduleCount" and the non-null "moduleIds" in file order.
+        None: If there is no phaseCollectionConfigurations entry.
+    """
+    first_config: Optional[dict[str, Any]] = None
+    with open(existing_coco_path, "rb") as f:
+        for prefix, event, value in ijson.parse(f):
+            if first_config is None:
+                if prefix == _CONFIG_PREFIX and event == "start_map":
+                    first_config = {"moduleCount": 0, "moduleIds": []}
+            elif prefix == _MODULE_PREFIX:
+                if event == "start_map":
+                    first_config["moduleCount"] += 1
+            elif prefix == _MODULE_PREFIX + ".moduleId":
+                if event not in ("null", "start_map", "start_array"):
+                    first_config["moduleIds"].append(value)
+            elif prefix == _CONFIG_PREFIX + ".id" or prefix == _CONFIG_PREFIX + ".projectId":
+                first_config[prefix.rpartition(".")[2]] = value
+            elif prefix == _CONFIG_PREFIX and event == "end_map":
+                break  # only the first configuration is used
+    return first_config
+
+def _iter_first_config_modules(existing_coco_path: str, module_count: int) -> Iterator[dict[str, Any]]:
+    """
+    Second streaming pass: yields the first configuration's modules one at a time.
+    'module_count' comes from _scan_first_config() and stops the stream before
+    the modules of any later configuration.
+    """
+    with open(existing_coco_path, "rb") as f:
+        yield from islice(ijson.items(f, _MODULE_PREFIX, use_float=True), module_count)
+
+def _transform_rule_parameter(param: str, workflow_phase_id: int, old_to_new_id_map: dict[Any, int]) -> str:
+    """
+    Rewrites a rule parameter "module|<oldWorkflowPhaseId>.<oldModuleId>" to
+    "module|<workflow_phase_id>.<ephemeralId>". Parameters that do not match the
+    pattern, or whose module is not in the map (i.e. was not copied), are returned
+    unchanged rather than presented as a module of the new phase.
+    """
+    match = _MODULE_PARAM_RE.match(param)
+    if not match:
+        return param
+    new_module_id = old_to_new_id_map.get(int(match.group(1)))
+    if new_module_id is None:
+        return param
+    return f"module|{workflow_phase_id}.{new_module_id}"
+
+def _log(message: str) -> None:
+    """ Prints a timestamped debug line from transform.py. """
+    print(f"[{timestamp()}] [transform.py] {message}")
+
+def _noop(*args: Any, **kwargs: Any) -> None:
+    """ Stand-in for _log() when debug_log is False. """
+
+# Last formatted timestamp and the second it was formatted for
+_last_ts_sec: Optional[int] = None
+_last_ts_str = ""
+
+def timestamp() -> str:
+    """
+    Helper for consistent time-based logging. The formatted string is cached
+    and only rebuilt when the wall-clock second changes.
+    """
+    global _last_ts_sec, _last_ts_str
+    now_sec = int(time.time())
+    if now_sec != _last_ts_sec:
+        _last_ts_sec = now_sec
+        _last_ts_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now_sec))
+    return _last_ts_str